@@ -1,31 +1,154 @@
 # app.py
 
 import uvicorn
-import json
+import orjson
 import os
+import asyncio
+import gc
+import logging
+from contextlib import asynccontextmanager
+
+import anyio.to_thread
 from fastapi import FastAPI, Body
+from fastapi.concurrency import run_in_threadpool
+
+from src.search.ann_index import load_ann_index
+from src.search.chunk_index import ChunkIndex
+from src.utils.index_store import index_exists, load_chunk_index
+
+logger = logging.getLogger(__name__)
+
+# Worker threads available to run_in_threadpool (anyio defaults to 40)
+THREADPOOL_SIZE = 100
+
+# Uvicorn worker processes. Every worker loads its own embedding model and
+# LLM, so raise this only when there is memory (or GPUs) for one copy each.
+WORKERS = int(os.environ.get("QUERYDOC_WORKERS", "1"))
+
+# Concurrent /ask requests are grouped into one answer_batch call of up to
+# MAX_BATCH questions, waiting at most MAX_WAIT_MS for a batch to fill
+MAX_BATCH = 16
+MAX_WAIT_MS = 10
 
-from src.chatbot import PDFChatBot
+# Shared PDFChatBot, created once per worker process in lifespan()
+chatbot = None
+# (question, future) pairs waiting for the batcher
+request_queue = None
 
-app = FastAPI()
 
-# 1) Load section information (sections_with_emb.json)
-sections_path = "data/extracted/sections_with_emb.json"
-with open(sections_path, 'r', encoding='utf-8') as f:
-    sections_data = json.load(f)
+def load_chatbot():
+    """
+    Load the section/chunk data and build the worker's PDFChatBot.
+
+    Returns
+    -------
+    PDFChatBot
+        Chatbot over the sample document index.
+    """
+    # Imported here so the uvicorn supervisor process never loads the models
+    from src.chatbot import PDFChatBot
+
+    # 1) Load section information (sections_with_emb.json)
+    sections_path = "data/extracted/sections_with_emb.json"
+    with open(sections_path, 'rb') as f:
+        sections_data = orjson.loads(f.read())
 
-# 2) Load chunk index (sample_chunks_vectors.json)
-chunk_index_path = "data/index/sample_chunks_vectors.json"
-with open(chunk_index_path, 'r', encoding='utf-8') as f:
-    chunk_index_data = json.load(f)
+    # 2) Load chunk index – memory-mapped .npy sidecar if built, else the JSON file.
+    # The mapping is backed by the OS page cache, so workers share its pages.
+    # Either way it is held column-wise (one vector matrix + per-field lists).
+    chunk_index_base = "data/index/sample_chunks"
+    chunk_index_path = "data/index/sample_chunks_vectors.json"
+    if index_exists(chunk_index_base):
+        chunk_index = load_chunk_index(chunk_index_base)
+    else:
+        with open(chunk_index_path, 'rb') as f:
+            chunk_index = ChunkIndex.from_records(orjson.loads(f.read()))
+        # Release the per-chunk dicts and float lists parsed from JSON
+        gc.collect()
 
-chatbot = PDFChatBot(sections_data, chunk_index_data)
+    # 3) Optional IVFPQ index written by build_index.py for large corpora
+    ann_index = load_ann_index("data/index/sample_chunks.ivfpq")
+    # build_index.py and section_rep_builder.py write the two files separately;
+    # an index over a different chunk set would return the wrong row ids.
+    if ann_index is not None and ann_index.ntotal != len(chunk_index):
+        logger.warning(
+            "Ignoring %s: it holds %d vectors but the chunk index has %d; "
+            "re-run build_index.py to rebuild it.",
+            "data/index/sample_chunks.ivfpq", ann_index.ntotal, len(chunk_index),
+        )
+        ann_index = None
+
+    # Fine search runs on int8 codes; the float32 vectors stay in the mmap.
+    return PDFChatBot(sections_data, chunk_index, quantize=True, ann_index=ann_index)
+
+
+async def batcher():
+    """
+    Collect queued questions into batches and answer each batch with a single
+    ``chatbot.answer_batch`` call, resolving every request's future.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await request_queue.get()]
+        deadline = loop.time() + MAX_WAIT_MS / 1000
+        while len(batch) < MAX_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(request_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        questions = [question for question, _ in batch]
+        try:
+            answers = await run_in_threadpool(chatbot.answer_batch, questions)
+        except Exception as e:
+            if len(batch) == 1:
+                if not batch[0][1].done():
+                    batch[0][1].set_exception(e)
+                continue
+            # One bad question fails the whole batch; answer each on its own
+            # so only the offending request gets the error
+            for question, future in batch:
+                try:
+                    answer = await run_in_threadpool(chatbot.answer, question)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                    continue
+                if not future.done():
+                    future.set_result(answer)
+            continue
+        for (_, future), answer in zip(batch, answers):
+            if not future.done():  # the client may have disconnected
+                future.set_result(answer)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global chatbot, request_queue
+    # Raise the threadpool cap so bursts of /ask requests do not queue on it
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = THREADPOOL_SIZE
+    # Single shared instance – never rebuild the bot per request
+    chatbot = load_chatbot()
+    request_queue = asyncio.Queue()
+    batcher_task = asyncio.create_task(batcher())
+    yield
+    batcher_task.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
 
 @app.post("/ask")
-def ask_question(question: str = Body(..., embed=True)):
+async def ask_question(question: str = Body(..., embed=True)):
     """
     FastAPI endpoint that returns an answer for the given question.
 
+    The question is queued for the batcher, which answers it together with
+    other concurrent questions off the event loop.
+
     Parameters
     ----------
     question : str
@@ -36,8 +159,12 @@ def ask_question(question: str = Body(..., embed=True)):
     dict
         A JSON dictionary with a single key ``"answer"``.
     """
-    answer = chatbot.answer(question)
+    future = asyncio.get_running_loop().create_future()
+    await request_queue.put((question, future))
+    answer = await future
     return {"answer": answer}
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Import string form is required for multiple workers
+    uvicorn.run("app:app", host="0.0.0.0", port=8000, workers=WORKERS,
+                loop="uvloop", http="httptools")
@@ -3,23 +3,34 @@
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-import json
+import orjson
 import numpy as np
 from src.inference.embedding_model import embedding_model
+from src.search.ann_index import build_ivfpq_index, save_ann_index
 
-def build_chunk_index(chunks):
+def build_chunk_index(chunks, ann_index_path=None):
     """
     chunks: [{"content": "...", "section_title": "...", ...}, ...]
     Embed each content using the embedding model
-    Returns [{ "embedding": [...], "metadata": {...} }, ...] format
+    Returns [{ "embedding": np.ndarray, "metadata": {...} }, ...] format
+
+    ann_index_path: if given, also train a FAISS IVFPQ index over the
+    embeddings and write it there (skipped for small corpora / no faiss)
     """
     contents = [c["content"] for c in chunks]
     embeddings = embedding_model.get_embeddings(contents)  # shape: (N, emb_dim)
 
+    if ann_index_path:
+        ann_index = build_ivfpq_index(embeddings)
+        if ann_index is not None:
+            save_ann_index(ann_index, ann_index_path)
+        elif os.path.exists(ann_index_path):
+            os.remove(ann_index_path)  # stale index from a previous, larger build
+
     index_data = []
     for i, emb in enumerate(embeddings):
         index_data.append({
-            "embedding": emb.tolist(),
+            "embedding": emb,  # row view; orjson serializes it directly
             "metadata": chunks[i]
         })
     return index_data
@@ -32,14 +43,15 @@ if __name__ == "__main__":
     for fname in os.listdir(chunk_folder):
         if fname.endswith("_chunks.json"):
             path = os.path.join(chunk_folder, fname)
-            with open(path, 'r', encoding='utf-8') as f:
-                chunked_data = json.load(f)
-
-            index_data = build_chunk_index(chunked_data)
+            with open(path, 'rb') as f:
+                chunked_data = orjson.loads(f.read())
 
             base_name = os.path.splitext(fname)[0]
+            ann_path = os.path.join(index_folder, f"{base_name}.ivfpq")
+            index_data = build_chunk_index(chunked_data, ann_index_path=ann_path)
+
             out_path = os.path.join(index_folder, f"{base_name}_vectors.json")
-            with open(out_path, 'w', encoding='utf-8') as f:
-                json.dump(index_data, f, ensure_ascii=False, indent=2)
+            with open(out_path, 'wb') as f:
+                f.write(orjson.dumps(index_data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
 
     print("Build index complete.")
\ No newline at end of file
@@ -3,27 +3,43 @@
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-import json
-from typing import List, Dict, Any
+import orjson
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import chain, repeat
+from typing import List, Dict, Any, Optional, Tuple
 from src.utils.text_cleaning import basic_clean_text
 
 # Tune these two to balance chunk length and redundancy
 CHUNK_SIZE = 1200  # characters per chunk
 OVERLAP = 200      # characters of overlap between consecutive chunks
 
-def get_section_of_page(page_num: int, toc: List[List[Any]]) -> str:
+# Below this many pages, dispatching to worker processes costs more than
+# chunking serially
+PARALLEL_MIN_PAGES = 64
+
+def build_page_section_map(toc: List[List[Any]], num_pages: int) -> List[str]:
     """
-    Get the section title for a given page number based on the table of contents.
+    Map every page to its section title in one sweep over the table of contents.
     toc: List of tuples (level, title, start_page)
-    page_num: 0-indexed page number
-    """ 
-    current_section = "Others"
+    Returns a list where index i holds the section title of 0-indexed page i.
+
+    An entry covers pages from its start page up to the next entry's start page.
+    Start pages are taken as a running maximum so a ToC that is not sorted
+    labels pages the same way a front-to-back scan of the ToC would.
+    """
+    page_to_section = ["Others"] * num_pages
+    spans = []
+    reach = None
     for (lvl, title, start_p) in toc:
-        if page_num + 1 >= start_p:
-            current_section = title
-        else:
-            break
-    return current_section
+        reach = start_p if reach is None else max(reach, start_p)
+        spans.append((reach, title))
+
+    for i, (start_p, title) in enumerate(spans):
+        next_start = spans[i + 1][0] if i + 1 < len(spans) else num_pages + 1
+        begin = min(max(start_p - 1, 0), num_pages)
+        end = min(max(next_start - 1, begin), num_pages)
+        page_to_section[begin:end] = [title] * (end - begin)
+    return page_to_section
 
 def chunk_text(text: str, chunk_size: int, overlap: int) -> List[str]:
     """
@@ -34,63 +50,104 @@ def chunk_text(text: str, chunk_size: int, overlap: int) -> List[str]:
     if not text:
         return []
 
-    chunks = []
-    start = 0
     step = max(chunk_size - overlap, 1)  # avoid infinite loop if overlap >= size
+    # Chunk starts run until the first window that reaches the end of the text
+    last_start = max(len(text) - chunk_size, 0)
+    starts = range(0, last_start + step, step)
+    return [c for c in (text[i:i + chunk_size].strip() for i in starts) if c]
+
+def _chunk_page(page: Tuple[int, str, str, str]) -> List[Dict[str, Any]]:
+    """
+    Chunk a single page. Takes one (page_idx, text, section_title, pdf_path)
+    tuple and lives at module level so it can be pickled for worker processes.
+    """
+    page_idx, text, section_title, pdf_path = page
+    return [
+        {
+            "file_path": pdf_path,
+            "page_idx": page_idx,
+            "section_title": section_title,
+            "chunk_index": c_i,
+            "content": c_text
+        }
+        for c_i, c_text in enumerate(chunk_text(text, CHUNK_SIZE, OVERLAP))
+    ]
 
-    while start < len(text):
-        end = start + chunk_size
-        chunk_str = text[start:end].strip()
-        if chunk_str:
-            chunks.append(chunk_str)
-        if end >= len(text):
-            break
-        start += step
-    return chunks
-
-def process_extracted_file(json_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+def process_extracted_file(json_data: Dict[str, Any],
+                           executor: Optional[Executor] = None) -> List[Dict[str, Any]]:
     """
     json_data: {
       "file_path": "...",
       "toc": [(level, title, start_page), ...],
       "pages_text": ["page0 text", "page1 text", ...]
     }
+    executor: optional caller-owned process pool; documents of at least
+    PARALLEL_MIN_PAGES pages are chunked on it. Without one, chunking runs
+    serially in the calling process (as it must inside the web server).
     """
     pdf_path = json_data["file_path"]
     toc = json_data["toc"]
     pages_text = json_data["pages_text"]
 
-    chunked_result = []
-    for page_idx, text in enumerate(pages_text):
-        section_title = get_section_of_page(page_idx, toc)
-        # chunkify
-        splitted = chunk_text(text, CHUNK_SIZE, OVERLAP)
-        for c_i, c_text in enumerate(splitted):
-            chunked_result.append({
-                "file_path": pdf_path,
-                "page_idx": page_idx,
-                "section_title": section_title,
-                "chunk_index": c_i,
-                "content": c_text
-            })
-    return chunked_result
+    page_to_section = build_page_section_map(toc, len(pages_text))
+    pages = zip(range(len(pages_text)), pages_text, page_to_section, repeat(pdf_path))
+
+    # Pages are independent, so CPU-bound chunking fans out across processes
+    if executor is not None and len(pages_text) >= PARALLEL_MIN_PAGES:
+        per_page = executor.map(_chunk_page, pages, chunksize=16)
+    else:
+        per_page = map(_chunk_page, pages)
+
+    # Per-page lists are flattened in one pass instead of growing a result list
+    return list(chain.from_iterable(per_page))
+
+def _manifest_key(path: str) -> List[int]:
+    """
+    Fingerprint of an extracted file plus the chunking settings; a file
+    whose key is unchanged since the last run does not need re-chunking.
+    """
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size, CHUNK_SIZE, OVERLAP]
 
 if __name__ == "__main__":
     extracted_folder = "data/extracted"
     chunk_folder = "data/chunks"
     os.makedirs(chunk_folder, exist_ok=True)
 
+    # {fname: [mtime_ns, size, chunk_size, overlap]} from the previous run
+    manifest_path = os.path.join(chunk_folder, "_manifest.json")
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'rb') as f:
+            manifest = orjson.loads(f.read())
+
+    # One pool for the whole run rather than one per file
+    executor = ProcessPoolExecutor()
+    skipped = 0
     for fname in os.listdir(extracted_folder):
         # Skip sections.json file
         if fname.endswith(".json") and fname != "sections.json":
             path = os.path.join(extracted_folder, fname)
-            with open(path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            chunked_data = process_extracted_file(data)
-
             base_name = os.path.splitext(fname)[0]
             out_json = os.path.join(chunk_folder, f"{base_name}_chunks.json")
-            with open(out_json, 'w', encoding='utf-8') as f:
-                json.dump(chunked_data, f, ensure_ascii=False, indent=2)
 
-    print("Chunking Complete.")
\ No newline at end of file
+            key = _manifest_key(path)
+            if manifest.get(fname) == key and os.path.exists(out_json):
+                skipped += 1
+                continue
+
+            with open(path, 'rb') as f:
+                data = orjson.loads(f.read())
+            chunked_data = process_extracted_file(data, executor)
+
+            with open(out_json, 'wb') as f:
+                f.write(orjson.dumps(chunked_data, option=orjson.OPT_INDENT_2))
+            manifest[fname] = key
+
+    executor.shutdown()
+
+    with open(manifest_path + ".tmp", 'wb') as f:
+        f.write(orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+    print(f"Chunking Complete. ({skipped} unchanged file(s) skipped)")
@@ -1,7 +1,7 @@
 # scripts/pdf_extractor.py
 
 import os
-import json
+import orjson
 import sys
 import fitz  # PyMuPDF
 from typing import Dict, Any, List, Tuple
@@ -251,8 +251,8 @@ def extract_pdf_content(pdf_path: str,
 
 def save_extracted_content(content: Dict[str, Any], output_path: str):
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(content, f, ensure_ascii=False, indent=2)
+    with open(output_path, 'wb') as f:
+        f.write(orjson.dumps(content, option=orjson.OPT_INDENT_2))
 
 if __name__ == "__main__":
     # Directory for original PDFs (e.g., data/original)
@@ -294,8 +294,8 @@ if __name__ == "__main__":
 
     # Also save merged sections as sections.json for convenience
     sections_output = os.path.join(output_folder, "sections.json")
-    with open(sections_output, 'w', encoding='utf-8') as f:
-        json.dump(extracted_data["sections"], f, ensure_ascii=False, indent=2)
+    with open(sections_output, 'wb') as f:
+        f.write(orjson.dumps(extracted_data["sections"], option=orjson.OPT_INDENT_2))
     print(f"Sections saved to {sections_output}")
 
     print("PDF Extraction Complete.")
\ No newline at end of file
@@ -3,9 +3,10 @@
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-import json
+import orjson
 import numpy as np
 from src.inference.embedding_model import embedding_model
+from src.utils.index_store import save_chunk_index
 
 def build_section_reps(sections, chunk_index):
     """
@@ -21,13 +22,13 @@ def build_section_reps(sections, chunk_index):
     titles = [sec["title"] for sec in sections]
     title_embs = embedding_model.get_embeddings(titles)  # shape: (num_sections, dim)
     for i, sec in enumerate(sections):
-        sec["title_emb"] = title_embs[i].tolist()
+        sec["title_emb"] = title_embs[i]
 
     # 2) Collect chunks by section
     section2embs = {}
     for item in chunk_index:
         sec_t = item["metadata"]["section_title"]
-        emb = item["embedding"]  # list[float]
+        emb = item["embedding"]  # list[float] | np.ndarray
         if sec_t not in section2embs:
             section2embs[sec_t] = []
         section2embs[sec_t].append(emb)
@@ -40,7 +41,7 @@ def build_section_reps(sections, chunk_index):
         else:
             arr = np.array(section2embs[stitle])  # shape: (num_chunks, emb_dim)
             avg_vec = arr.mean(axis=0)            # (emb_dim,)
-            sec["avg_chunk_emb"] = avg_vec.tolist()
+            sec["avg_chunk_emb"] = avg_vec
     
     return sections
 
@@ -50,18 +51,24 @@ if __name__ == "__main__":
     # Example: data/index/sample_chunks_vectors.json (chunk embeddings)
     chunk_index_json = "data/index/sample_chunks_vectors.json"
 
-    with open(sections_json, 'r', encoding='utf-8') as f:
-        sections_data = json.load(f)
+    with open(sections_json, 'rb') as f:
+        sections_data = orjson.loads(f.read())
     
-    with open(chunk_index_json, 'r', encoding='utf-8') as f:
-        chunk_index_data = json.load(f)
+    with open(chunk_index_json, 'rb') as f:
+        chunk_index_data = orjson.loads(f.read())
 
     # Generate section representative vectors
     updated_sections = build_section_reps(sections_data, chunk_index_data)
 
     # Save (e.g., data/extracted/sections_with_emb.json)
     out_path = "data/extracted/sections_with_emb.json"
-    with open(out_path, 'w', encoding='utf-8') as f:
-        json.dump(updated_sections, f, ensure_ascii=False, indent=2)
+    with open(out_path, 'wb') as f:
+        f.write(orjson.dumps(updated_sections, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
 
-    print("Section reps built and saved.")
\ No newline at end of file
+    print("Section reps built and saved.")
+
+    # Write the chunk vectors as a memory-mappable .npy sidecar for app.py
+    # (data/index/sample_chunks.vectors.npy + sample_chunks.meta.json)
+    save_chunk_index(chunk_index_data, "data/index/sample_chunks")
+
+    print("Chunk index sidecar saved.")
\ No newline at end of file
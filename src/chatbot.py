@@ -3,10 +3,13 @@
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-import json
+import orjson
 import logging
+import numpy as np
 from src.search.section_coarse_search import coarse_search_sections
 from src.search.fine_search import fine_search_chunks
+from src.search.quantization import quantize_int8
+from src.search.chunk_index import as_chunk_index
 from src.inference.embedding_model import embedding_model
 from src.inference.llm_model import local_llm  # Example implementation of a local LLM
 from src.utils.exceptions import SearchError, EmbeddingError
@@ -27,22 +30,40 @@ DEFAULT_SYSTEM_PROMPT = (
 
 
 class PDFChatBot:
-    def __init__(self, sections, chunk_index, system_prompt: str = DEFAULT_SYSTEM_PROMPT):
+    def __init__(self, sections, chunk_index, system_prompt: str = DEFAULT_SYSTEM_PROMPT,
+                 quantize: bool = False, ann_index=None):
         """
         Parameters
         ----------
         sections : list[dict]
             Each element contains keys such as ``"title"``, ``"title_emb"``,
             ``"avg_chunk_emb"``, etc.
-        chunk_index : list[dict]
+        chunk_index : list[dict] | ChunkIndex
             Each chunk is a dictionary like
-            ``{"embedding": [...], "metadata": {...}}``.
+            ``{"embedding": [...], "metadata": {...}}``. A list is converted
+            to a columnar ``ChunkIndex`` once, here.
         system_prompt : str
             System prompt that is prepended before calling the LLM.
+        quantize : bool
+            If ``True``, keep an int8 copy of the chunk embeddings and run
+            fine search against it (4× smaller than float32).
+        ann_index : faiss.Index | None
+            Optional IVFPQ index over *chunk_index* used to shortlist
+            candidates before exact re-ranking.
         """
         self.sections = sections
-        self.chunk_index = chunk_index
+        self.chunk_index = as_chunk_index(chunk_index)
         self.system_prompt = system_prompt
+        self.ann_index = ann_index
+        self.quantized = None
+        if quantize and len(self.chunk_index) > 0:
+            # Quantize segment by segment so a merged index is never copied
+            # to one float32 matrix
+            codes, scales = zip(*(quantize_int8(seg) for seg in self.chunk_index.segments))
+            self.quantized = (np.concatenate(codes), np.concatenate(scales))
+        else:
+            # Precompute vector norms so the first query doesn't pay for them
+            self.chunk_index.inv_norms
 
     def build_prompt(self, user_query, retrieved_chunks):
         """
@@ -71,6 +92,34 @@ class PDFChatBot:
         prompt = f"{self.system_prompt}\n\n=== Document Context ===\n{context_text}\n\n=== User Question ===\n{user_query}\n\n=== Answer ===\n"
         return prompt.strip()
 
+    @staticmethod
+    def build_improvement_prompt(user_query, retrieved_chunks):
+        """
+        Construct the prompt asking the LLM for a supplemental question based
+        on ALL retrieved evidence.
+        """
+        # Build a single string that contains the content of every retrieved chunk
+        combined_answer = "\n\n".join(
+            chunk["metadata"].get("content", "") for chunk in retrieved_chunks
+        )
+        return (
+            "The user question is: " + user_query + "\n\n"
+            "The retrieved chunks are:\n" + combined_answer + "\n\n"
+            "Based on the retrieved chunks above, generate a supplemental question that would help retrieve even more relevant information.\n Only display the final question.\n"
+            "The improved question is: "
+        )
+
+    @staticmethod
+    def parse_improved_query(llm_output, user_query):
+        """
+        Extract the improved question from the raw LLM output, falling back to
+        *user_query* if it cannot be parsed.
+        """
+        if "<|im_start|>assistant" in llm_output and "<|im_end|>" in llm_output:
+            return llm_output.split("<|im_start|>assistant")[1].split("<|im_end|>")[0].strip()
+        logger.warning("Could not parse improved query, using original query")
+        return user_query
+
     def answer(self, query: str, beta: float = 0.3, top_sections: int = 10, top_chunks: int = 5, streaming=False, fine_only=False):
         """
         End‑to‑end answer generation pipeline.
@@ -114,31 +163,17 @@ class PDFChatBot:
             raise EmbeddingError(f"Failed to generate query embedding: {e}")
 
         try:
-            best_chunks = fine_search_chunks(query_emb, chunk_index, relevant_secs, top_k=top_chunks, fine_only=fine_only)
+            best_chunks = fine_search_chunks(query_emb, chunk_index, relevant_secs, top_k=top_chunks, fine_only=fine_only,
+                                             quantized=self.quantized, ann_index=self.ann_index)
         except Exception as e:
             logger.error(f"Error in fine search: {e}")
             raise SearchError(f"Failed to perform fine search: {e}")
 
-        # Build a single string that contains the content of every retrieved chunk
-        combined_answer = "\n\n".join(
-            chunk["metadata"].get("content", "") for chunk in best_chunks
-        )
-
         # Ask the LLM to improve the user query based on ALL retrieved evidence
-        query_improvement_prompt = (
-            "The user question is: " + query + "\n\n"
-            "The retrieved chunks are:\n" + combined_answer + "\n\n"
-            "Based on the retrieved chunks above, generate a supplemental question that would help retrieve even more relevant information.\n Only display the final question.\n"
-            "The improved question is: "
-        )
+        query_improvement_prompt = self.build_improvement_prompt(query, best_chunks)
         try:
             improved_query = local_llm.generate(query_improvement_prompt, streaming=streaming)
-            # Safely extract improved query
-            if "<|im_start|>assistant" in improved_query and "<|im_end|>" in improved_query:
-                improved_query = improved_query.split("<|im_start|>assistant")[1].split("<|im_end|>")[0].strip()
-            else:
-                logger.warning("Could not parse improved query, using original query")
-                improved_query = query
+            improved_query = self.parse_improved_query(improved_query, query)
         except Exception as e:
             logger.error(f"Error generating improved query: {e}")
             improved_query = query
@@ -158,7 +193,9 @@ class PDFChatBot:
         try:
             best_chunks = fine_search_chunks(query_emb, chunk_index, 
                                            relevant_secs, top_k=top_chunks, 
-                                           fine_only=fine_only)
+                                           fine_only=fine_only,
+                                           quantized=self.quantized,
+                                           ann_index=self.ann_index)
         except Exception as e:
             logger.error(f"Error in fine search with improved query: {e}")
             raise SearchError(f"Failed to perform fine search with improved query: {e}")
@@ -172,6 +209,88 @@ class PDFChatBot:
             logger.error(f"Error generating answer: {e}")
             return f"Sorry, an error occurred while generating the answer: {str(e)}"
 
+    def _search_batch(self, queries, query_embs, beta, top_sections, top_chunks, fine_only):
+        """Run coarse + fine search for each query using precomputed embeddings."""
+        results = []
+        for query, query_emb in zip(queries, query_embs):
+            if fine_only:
+                relevant_secs = self.sections
+            else:
+                relevant_secs = coarse_search_sections(query, self.sections, beta=beta,
+                                                       top_k=top_sections, query_emb=query_emb)
+            results.append(fine_search_chunks(query_emb, self.chunk_index, relevant_secs,
+                                              top_k=top_chunks, fine_only=fine_only,
+                                              quantized=self.quantized, ann_index=self.ann_index))
+        return results
+
+    def answer_batch(self, queries, beta: float = 0.3, top_sections: int = 10, top_chunks: int = 5, fine_only=False):
+        """
+        Answer several questions with the same pipeline as :meth:`answer`,
+        embedding all queries in one call and batching both LLM calls.
+
+        Parameters
+        ----------
+        queries : list[str]
+            User questions.
+        beta, top_sections, top_chunks, fine_only
+            Same as in :meth:`answer`.
+
+        Returns
+        -------
+        list[str]
+            The LLM’s answer text for each query, in input order.
+        """
+        queries = list(queries)
+        try:
+            query_embs = embedding_model.get_embeddings(queries)
+        except Exception as e:
+            logger.error(f"Error generating query embeddings: {e}")
+            raise EmbeddingError(f"Failed to generate query embeddings: {e}")
+
+        try:
+            best_chunks = self._search_batch(queries, query_embs, beta, top_sections, top_chunks, fine_only)
+        except Exception as e:
+            logger.error(f"Error in batched search: {e}")
+            raise SearchError(f"Failed to perform batched search: {e}")
+
+        improvement_prompts = [
+            self.build_improvement_prompt(query, chunks)
+            for query, chunks in zip(queries, best_chunks)
+        ]
+        try:
+            outputs = local_llm.generate_batch(improvement_prompts)
+            improved_queries = [
+                self.parse_improved_query(output, query)
+                for output, query in zip(outputs, queries)
+            ]
+        except Exception as e:
+            logger.error(f"Error generating improved queries: {e}")
+            improved_queries = queries
+
+        combined_queries = [
+            query + ':' + improved_query
+            for query, improved_query in zip(queries, improved_queries)
+        ]
+        try:
+            query_embs = embedding_model.get_embeddings(combined_queries)
+        except Exception as e:
+            logger.error(f"Error generating combined query embeddings: {e}")
+            raise EmbeddingError(f"Failed to generate combined query embeddings: {e}")
+
+        try:
+            best_chunks = self._search_batch(combined_queries, query_embs, beta, top_sections, top_chunks, fine_only)
+        except Exception as e:
+            logger.error(f"Error in batched search with improved queries: {e}")
+            raise SearchError(f"Failed to perform batched search with improved queries: {e}")
+
+        # Generate LLM answers
+        try:
+            prompts = [self.build_prompt(query, chunks) for query, chunks in zip(queries, best_chunks)]
+            return local_llm.generate_batch(prompts)
+        except Exception as e:
+            logger.error(f"Error generating answers: {e}")
+            return [f"Sorry, an error occurred while generating the answer: {str(e)}"] * len(queries)
+
 if __name__ == "__main__":
     sections_path = "data/extracted/sections_with_emb.json"
     chunk_index_path = "data/index/sample_chunks_vectors.json"
@@ -180,15 +299,15 @@ if __name__ == "__main__":
         print(f"[ERROR] Sections file not found: {sections_path}")
         exit(1)
     else:
-        with open(sections_path, 'r', encoding='utf-8') as f:
-            sections = json.load(f)
+        with open(sections_path, 'rb') as f:
+            sections = orjson.loads(f.read())
 
     if not os.path.exists(chunk_index_path):
         print(f"[ERROR] Chunk index file not found: {chunk_index_path}")
         exit(1)
     else:
-        with open(chunk_index_path, 'r', encoding='utf-8') as f:
-            chunk_index = json.load(f)
+        with open(chunk_index_path, 'rb') as f:
+            chunk_index = orjson.loads(f.read())
 
     chatbot = PDFChatBot(sections, chunk_index)
     print("Chatbot is ready. Enter your question below:")
@@ -14,6 +14,9 @@ class LocalLLM:
             cache_dir="data/hub",
             padding_side='left',
         )
+        # Batched generation pads prompts; fall back to EOS if no pad token
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
         self.model = AutoModelForCausalLM.from_pretrained(
             model_name,
             torch_dtype=torch.bfloat16,
@@ -61,6 +64,42 @@ class LocalLLM:
             )
             return self.tokenizer.decode(output[0])
 
+    def generate_batch(self, prompts):
+        """
+        Generate answers for several prompts in one padded ``generate`` call.
+        Each returned string has the same form as ``generate(prompt)``: the
+        prompt followed by the completion up to and including EOS.
+        """
+        texts = [
+            self.tokenizer.apply_chat_template(
+                [{"role": "user", "content": prompt}],
+                tokenize=False,
+                add_generation_prompt=True,
+            )
+            for prompt in prompts
+        ]
+        inputs = self.tokenizer(texts, return_tensors="pt", padding=True, add_special_tokens=False)
+        output = self.model.generate(
+            input_ids=inputs["input_ids"].to(self.device),
+            attention_mask=inputs["attention_mask"].to(self.device),
+            eos_token_id=self.tokenizer.eos_token_id,
+            pad_token_id=self.tokenizer.pad_token_id,
+            max_new_tokens=4096,
+            do_sample=True,
+            temperature=0.6,
+            top_p=0.95,
+        )
+
+        prompt_len = inputs["input_ids"].shape[1]
+        results = []
+        for i, seq in enumerate(output):
+            # Drop left padding and anything generated after this row's EOS
+            start = int((inputs["attention_mask"][i] == 0).sum())
+            eos_pos = (seq[prompt_len:] == self.tokenizer.eos_token_id).nonzero()
+            end = prompt_len + int(eos_pos[0]) + 1 if len(eos_pos) else len(seq)
+            results.append(self.tokenizer.decode(seq[start:end]))
+        return results
+
 
 device, attn_implementation = get_device_and_attention()
 local_llm = LocalLLM(model_name="trillionlabs/Trillion-7B-preview",
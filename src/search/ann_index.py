@@ -0,0 +1,99 @@
+# src/search/ann_index.py
+
+import os
+import logging
+import numpy as np
+from typing import List, Union
+
+try:
+    import faiss
+except ImportError:  # faiss is optional; fine search falls back to exact scoring
+    faiss = None
+
+logger = logging.getLogger(__name__)
+
+# k-means wants ~39 training points per centroid. The PQ codebooks have
+# 2**ANN_NBITS = 256 centroids each, so below ~10k vectors use exact search.
+ANN_POINTS_PER_CENTROID = 39
+ANN_MIN_VECTORS = 10000
+ANN_MAX_LISTS = 1024
+ANN_SUBQUANTIZERS = 8   # PQ sub-vectors (embedding dim must be divisible by this)
+ANN_NBITS = 8           # bits per sub-vector code
+ANN_NPROBE = 16         # inverted lists visited per query
+
+
+def build_ivfpq_index(embeddings: np.ndarray):
+    """
+    Train a FAISS IVFPQ index over chunk embeddings.
+
+    Vectors are L2-normalized first so L2 ranking matches cosine ranking.
+
+    Parameters
+    ----------
+    embeddings : np.ndarray
+        Matrix of chunk embeddings (n_samples, n_features)
+
+    Returns
+    -------
+    faiss.IndexIVFPQ | None
+        Trained index containing every vector, or ``None`` when faiss is not
+        installed or the corpus is smaller than ``ANN_MIN_VECTORS``.
+    """
+    if faiss is None or len(embeddings) < ANN_MIN_VECTORS:
+        return None
+    vecs = np.array(embeddings, dtype=np.float32)  # copy: normalize_L2 is in-place
+    faiss.normalize_L2(vecs)
+    dim = vecs.shape[1]
+    # 4*sqrt(N) lists, capped so the coarse quantizer is not under-trained
+    nlist = min(ANN_MAX_LISTS, int(4 * np.sqrt(len(vecs))),
+                len(vecs) // ANN_POINTS_PER_CENTROID)
+
+    quantizer = faiss.IndexFlatL2(dim)
+    index = faiss.IndexIVFPQ(quantizer, dim, nlist, ANN_SUBQUANTIZERS, ANN_NBITS)
+    index.train(vecs)
+    index.add(vecs)
+    index.nprobe = min(ANN_NPROBE, nlist)
+    return index
+
+
+def save_ann_index(index, path: str):
+    """Write a FAISS index to *path*."""
+    faiss.write_index(index, path)
+
+
+def load_ann_index(path: str):
+    """
+    Read a FAISS index written by :func:`save_ann_index`.
+
+    Returns ``None`` if the file does not exist or faiss is not installed.
+    """
+    if not os.path.exists(path):
+        return None
+    if faiss is None:
+        logger.warning(f"faiss is not installed; ignoring ANN index {path}")
+        return None
+    return faiss.read_index(path)
+
+
+def ann_candidates(index, query_emb: Union[np.ndarray, List[float]], k: int) -> List[int]:
+    """
+    Return the row ids of the (approximately) *k* nearest chunks.
+
+    Parameters
+    ----------
+    index : faiss.Index
+        Index built by :func:`build_ivfpq_index`
+    query_emb : Union[np.ndarray, List[float]]
+        Query embedding vector
+    k : int
+        Number of candidates to retrieve
+
+    Returns
+    -------
+    List[int]
+        Candidate row ids, nearest first
+    """
+    query_vec = np.array(query_emb, dtype=np.float32).reshape(1, -1)
+    faiss.normalize_L2(query_vec)
+    _, ids = index.search(query_vec, k)
+    return [int(i) for i in ids[0] if i >= 0]
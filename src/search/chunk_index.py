@@ -0,0 +1,164 @@
+# src/search/chunk_index.py
+
+import sys
+from functools import cached_property
+import numpy as np
+from typing import Dict, List, Optional, Union
+
+
+class ChunkIndex:
+    """
+    Columnar (structure-of-arrays) chunk index.
+
+    Embeddings live in ``(n, dim)`` float32 matrices and each metadata field
+    in its own column, instead of one dict per chunk. Indexing or iterating
+    yields the usual ``{"embedding": ..., "metadata": {...}}`` record, built on
+    demand, so code written against ``list[dict]`` indexes keeps working.
+
+    An index merged with :meth:`concat` keeps each part's matrix as a separate
+    segment (e.g. one memory-mapped file per PDF) rather than copying them
+    into one array; :meth:`dot` scores rows segment by segment.
+    """
+
+    def __init__(self, vectors: np.ndarray, metadata: List[Dict]):
+        """
+        Parameters
+        ----------
+        vectors : np.ndarray
+            Chunk embeddings (n_chunks, n_features); may be a read-only memmap.
+        metadata : List[Dict]
+            Per-chunk metadata as produced by ``chunker.process_extracted_file``.
+            Only its fields are copied into columns; the dicts can be freed.
+        """
+        # Row blocks of the embedding matrix and the global row of each block
+        self.segments = [vectors]
+        self.segment_starts = np.zeros(1, dtype=np.intp)
+        # Repeated paths share a single string object
+        self.file_paths = [sys.intern(m.get("file_path", "")) for m in metadata]
+        # Section titles are stored once; each chunk holds an int32 id into
+        # section_names, so section filters are a vectorized np.isin
+        self.section_id_of: Dict[str, int] = {}
+        self.section_ids = np.fromiter(
+            (self.section_id_of.setdefault(m.get("section_title", ""), len(self.section_id_of))
+             for m in metadata),
+            dtype=np.int32, count=len(metadata))
+        self.section_names = list(self.section_id_of)
+        self.contents = [m.get("content", "") for m in metadata]
+        self.page_idx = np.fromiter((m.get("page_idx", -1) for m in metadata),
+                                    dtype=np.int32, count=len(metadata))
+        self.chunk_idx = np.fromiter((m.get("chunk_index", -1) for m in metadata),
+                                     dtype=np.int32, count=len(metadata))
+
+    @classmethod
+    def from_records(cls, records: List[Dict]) -> "ChunkIndex":
+        """Build from a ``[{"embedding": [...], "metadata": {...}}, ...]`` list."""
+        vectors = np.asarray([item["embedding"] for item in records], dtype=np.float32)
+        return cls(vectors, [item["metadata"] for item in records])
+
+    @classmethod
+    def concat(cls, indexes: List["ChunkIndex"]) -> "ChunkIndex":
+        """
+        Merge several indexes in order. The parts' vector matrices are kept
+        as segments, not copied, so memory-mapped vectors stay mapped; the
+        metadata columns are joined.
+        """
+        if len(indexes) == 1:
+            return indexes[0]
+        merged = cls.__new__(cls)
+        merged.segments, starts, offset = [], [], 0
+        for ci in indexes:
+            for start, seg in zip(ci.segment_starts, ci.segments):
+                if len(seg) > 0:
+                    merged.segments.append(seg)
+                    starts.append(offset + start)
+            offset += len(ci)
+        if not merged.segments:
+            merged.segments, starts = [np.zeros((0, 0), dtype=np.float32)], [0]
+        merged.segment_starts = np.asarray(starts, dtype=np.intp)
+        merged.file_paths = [p for ci in indexes for p in ci.file_paths]
+        # Re-number each part's section ids into the merged name table
+        merged.section_id_of = {}
+        merged.section_ids = np.concatenate([
+            np.array([merged.section_id_of.setdefault(name, len(merged.section_id_of))
+                      for name in ci.section_names], dtype=np.int32)[ci.section_ids]
+            for ci in indexes
+        ])
+        merged.section_names = list(merged.section_id_of)
+        merged.contents = [c for ci in indexes for c in ci.contents]
+        merged.page_idx = np.concatenate([ci.page_idx for ci in indexes])
+        merged.chunk_idx = np.concatenate([ci.chunk_idx for ci in indexes])
+        return merged
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """
+        All embeddings as one ``(N, dim)`` matrix. For a merged index this
+        concatenates the segments (a copy); search code uses :meth:`dot`.
+        """
+        if len(self.segments) == 1:
+            return self.segments[0]
+        return np.concatenate(self.segments)
+
+    @cached_property
+    def inv_norms(self) -> np.ndarray:
+        """
+        Reciprocal L2 norm of every vector, computed once. Scaling raw dot
+        products by it yields cosine similarity without keeping a normalized
+        copy of (possibly memory-mapped) ``vectors``.
+        """
+        if len(self) == 0:
+            return np.zeros(0, dtype=np.float32)
+        norms = np.concatenate([np.linalg.norm(seg, axis=1) for seg in self.segments])
+        return (1.0 / (norms + 1e-8)).astype(np.float32)
+
+    def dot(self, query_vec: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Dot product of *query_vec* with every vector, or with the vectors of
+        *rows* (in that order), one matrix product per segment touched.
+        """
+        if rows is None:
+            return np.concatenate([seg @ query_vec for seg in self.segments])
+        rows = np.asarray(rows, dtype=np.intp)
+        if len(self.segments) == 1:
+            return self.segments[0][rows] @ query_vec
+        seg_of = np.searchsorted(self.segment_starts, rows, side="right") - 1
+        out = np.empty(len(rows), dtype=np.float32)
+        for s in np.unique(seg_of):
+            mask = seg_of == s
+            out[mask] = self.segments[s][rows[mask] - self.segment_starts[s]] @ query_vec
+        return out
+
+    def __len__(self) -> int:
+        return len(self.contents)
+
+    def __getitem__(self, i: int) -> Dict:
+        s = int(np.searchsorted(self.segment_starts, i, side="right")) - 1
+        return {
+            "embedding": self.segments[s][i - self.segment_starts[s]],
+            "metadata": self.metadata(i),
+        }
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def section_rows(self, titles) -> np.ndarray:
+        """Row ids of the chunks whose section title is in *titles*."""
+        wanted = [self.section_id_of[t] for t in titles if t in self.section_id_of]
+        return np.flatnonzero(np.isin(self.section_ids, wanted))
+
+    def metadata(self, i: int) -> Dict:
+        """Rebuild the metadata dict of chunk *i*."""
+        return {
+            "file_path": self.file_paths[i],
+            "page_idx": int(self.page_idx[i]),
+            "section_title": self.section_names[self.section_ids[i]],
+            "chunk_index": int(self.chunk_idx[i]),
+            "content": self.contents[i],
+        }
+
+
+def as_chunk_index(chunk_index: Union[ChunkIndex, List[Dict]]) -> ChunkIndex:
+    """Return *chunk_index* as a :class:`ChunkIndex`, converting a record list."""
+    if isinstance(chunk_index, ChunkIndex):
+        return chunk_index
+    return ChunkIndex.from_records(chunk_index)
@@ -1,8 +1,22 @@
 # src/search/fine_search.py
 
 import numpy as np
+from .quantization import int8_cosine_scores
+from .ann_index import ann_candidates
+from .chunk_index import as_chunk_index
 
-def fine_search_chunks(query_emb, chunk_index, target_sections, top_k=10, fine_only=False):
+# Shortlist size taken from the ANN index before exact re-ranking
+ANN_CANDIDATES = 64
+
+def _top_k_order(scores, k):
+    """Indices of the *k* highest scores, best first, without a full sort."""
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    top = np.argpartition(-scores, k)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+def fine_search_chunks(query_emb, chunk_index, target_sections, top_k=10, fine_only=False, quantized=None,
+                       ann_index=None):
     """
     Find the most relevant text chunks within the specified sections.
 
@@ -10,7 +24,7 @@ def fine_search_chunks(query_emb, chunk_index, target_sections, top_k=10, fine_o
     ----------
     query_emb : list[float] | np.ndarray
         Embedding vector of the user query.
-    chunk_index : list[dict]
+    chunk_index : ChunkIndex | list[dict]
         Each element is a dictionary like:
         {
             "embedding": [...],
@@ -28,32 +42,38 @@ def fine_search_chunks(query_emb, chunk_index, target_sections, top_k=10, fine_o
     Notes
     -----
     - Only chunks whose ``section_title`` appears in *target_sections* are considered.
-    - Cosine similarity is computed between the query embedding and each candidate
-      chunk. The chunks are then sorted in descending order of similarity and the
-      top *k* results are returned.
+    - Cosine similarity is computed between the query embedding and all candidate
+      chunks in a single matrix–vector product, and the top *k* are selected with
+      ``np.argpartition`` and returned in descending order of similarity.
     """
+    chunk_index = as_chunk_index(chunk_index)
+    if len(chunk_index) == 0:
+        return []
 
-    section_titles = [sec["title"] for sec in target_sections]
-    candidates = chunk_index
+    all_rows = range(len(chunk_index))
+    candidate_rows = all_rows
     if not fine_only:
-        candidates = [
-            item for item in candidates
-            if item["metadata"]["section_title"] in section_titles
-        ]
-        if len(candidates) == 0:
-            candidates = chunk_index
-    results = []
-    qv = np.array(query_emb)
-    q_norm = np.linalg.norm(qv)
-    for c in candidates:
-        emb = np.array(c["embedding"])
-        dot = np.dot(qv, emb)
-        denom = np.linalg.norm(emb) * q_norm + 1e-8
-        cos_val = dot / denom
-        results.append((cos_val, c))
-
-    results.sort(key=lambda x: x[0], reverse=True)
-
-    top_results = [r[1] for r in results[:top_k]]
-    return top_results
-    
\ No newline at end of file
+        rows = chunk_index.section_rows({sec["title"] for sec in target_sections})
+        if len(rows) > 0:
+            candidate_rows = rows
+
+    if ann_index is not None:
+        shortlist = np.asarray(ann_candidates(ann_index, query_emb, ANN_CANDIDATES), dtype=np.intp)
+        if candidate_rows is not all_rows:
+            shortlist = shortlist[np.isin(shortlist, candidate_rows)]
+        # The shortlist is drawn from the whole corpus; if too few of its hits
+        # fall inside the target sections, scan those sections exactly
+        if len(shortlist) >= min(top_k, len(candidate_rows)):
+            candidate_rows = shortlist
+
+    rows = None if candidate_rows is all_rows else candidate_rows
+    if quantized is not None:
+        codes, scales = quantized
+        scores = int8_cosine_scores(codes, scales, query_emb, rows=rows)
+    else:
+        qv = np.asarray(query_emb, dtype=np.float32)
+        qv = qv / (np.linalg.norm(qv) + 1e-8)
+        inv_norms = chunk_index.inv_norms if rows is None else chunk_index.inv_norms[rows]
+        scores = chunk_index.dot(qv, rows) * inv_norms
+
+    return [chunk_index[candidate_rows[i]] for i in _top_k_order(scores, top_k)]
@@ -0,0 +1,73 @@
+# src/search/quantization.py
+
+import numpy as np
+from typing import List, Optional, Sequence, Tuple, Union
+
+# Rows dequantized per matrix product; bounds the float32 scratch buffer
+SCORE_BLOCK_ROWS = 4096
+
+
+def quantize_int8(vectors: Union[np.ndarray, List[List[float]]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Quantize embeddings to int8 with one scale per vector.
+
+    Rows are L2-normalized first, so the dot product of two dequantized rows
+    approximates their cosine similarity.
+
+    Parameters
+    ----------
+    vectors : Union[np.ndarray, List[List[float]]]
+        Matrix of embeddings (n_samples, n_features)
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        (codes, scales) – int8 codes (n_samples, n_features) and float16
+        scales (n_samples,) such that ``codes * scales[:, None]`` recovers
+        the normalized rows.
+    """
+    vecs = np.asarray(vectors, dtype=np.float32)
+    unit = vecs / (np.linalg.norm(vecs, axis=1, keepdims=True) + 1e-8)
+    scales = np.maximum(np.abs(unit).max(axis=1), 1e-8) / 127.0
+    codes = np.round(unit / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float16)
+
+
+def int8_cosine_scores(codes: np.ndarray,
+                       scales: np.ndarray,
+                       query_emb: Union[np.ndarray, List[float]],
+                       rows: Optional[Sequence[int]] = None) -> np.ndarray:
+    """
+    Approximate cosine similarity between the query and quantized embeddings.
+
+    Codes are widened to float32 one block at a time so the product still runs
+    through BLAS while only the int8 matrix is kept resident.
+
+    Parameters
+    ----------
+    codes : np.ndarray
+        int8 codes from :func:`quantize_int8`
+    scales : np.ndarray
+        Per-row scales from :func:`quantize_int8`
+    query_emb : Union[np.ndarray, List[float]]
+        Query embedding vector
+    rows : Optional[Sequence[int]]
+        Restrict scoring to these row indices (default: all rows)
+
+    Returns
+    -------
+    np.ndarray
+        Similarity score for each scored row, in the order of *rows*
+    """
+    query_vec = np.asarray(query_emb, dtype=np.float32)
+    query_vec = query_vec / (np.linalg.norm(query_vec) + 1e-8)
+    if rows is not None:
+        rows = np.asarray(rows, dtype=np.intp)
+        codes = codes[rows]
+        scales = scales[rows]
+
+    scores = np.empty(len(codes), dtype=np.float32)
+    for start in range(0, len(codes), SCORE_BLOCK_ROWS):
+        block = codes[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+        scores[start:start + len(block)] = block @ query_vec
+    return scores * scales.astype(np.float32)
@@ -4,7 +4,7 @@ import numpy as np
 from ..inference.embedding_model import embedding_model
 from ..utils.similarity import cosine_similarity
 
-def coarse_search_sections(query: str, sections: list, beta=0.3, top_k=5):
+def coarse_search_sections(query: str, sections: list, beta=0.3, top_k=5, query_emb=None):
     """
     Select the most relevant document sections for the given query using a
     two‑stage cosine‑similarity score.
@@ -25,6 +25,8 @@ def coarse_search_sections(query: str, sections: list, beta=0.3, top_k=5):
         Interpolation weight between title similarity and average‑chunk similarity.
     top_k : int, default = 5
         Number of top‑scoring sections to return.
+    query_emb : list[float] | np.ndarray | None
+        Precomputed embedding of *query*; computed here if omitted.
 
     Notes
     -----
@@ -36,7 +38,8 @@ def coarse_search_sections(query: str, sections: list, beta=0.3, top_k=5):
 
         final_score = beta * sim_title + (1 - beta) * sim_chunk
     """
-    query_emb = embedding_model.get_embedding(query)
+    if query_emb is None:
+        query_emb = embedding_model.get_embedding(query)
 
     scored = []
     for sec in sections:
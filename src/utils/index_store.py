@@ -0,0 +1,65 @@
+# src/utils/index_store.py
+
+import os
+from typing import Tuple
+
+import numpy as np
+import orjson
+
+from src.search.chunk_index import ChunkIndex
+
+
+def index_paths(base_path: str) -> Tuple[str, str]:
+    """Return (vectors_path, meta_path) for the index stored at *base_path*."""
+    return f"{base_path}.vectors.npy", f"{base_path}.meta.json"
+
+
+def index_exists(base_path: str) -> bool:
+    """Check whether both files of a saved chunk index are present."""
+    return all(os.path.exists(p) for p in index_paths(base_path))
+
+
+def save_chunk_index(chunk_index: list, base_path: str):
+    """
+    Persist a chunk index as a float32 ``(N, dim)`` matrix in ``.npy`` format
+    plus a JSON list holding each chunk's metadata.
+
+    Each file is written to a temporary path and moved into place with
+    ``os.replace``, so readers never see a half-written file.
+
+    Parameters
+    ----------
+    chunk_index : list[dict] | ChunkIndex
+        Items of the form ``{"embedding": [...], "metadata": {...}}``.
+    base_path : str
+        Path prefix; ``.vectors.npy`` and ``.meta.json`` are appended.
+    """
+    vec_path, meta_path = index_paths(base_path)
+    vectors = np.asarray([item["embedding"] for item in chunk_index], dtype=np.float32)
+    with open(vec_path + ".tmp", "wb") as f:
+        np.save(f, vectors)
+    os.replace(vec_path + ".tmp", vec_path)
+    with open(meta_path + ".tmp", "wb") as f:
+        f.write(orjson.dumps([item["metadata"] for item in chunk_index]))
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+def load_chunk_index(base_path: str, mmap: bool = True) -> ChunkIndex:
+    """
+    Load a chunk index written by :func:`save_chunk_index`.
+
+    With ``mmap=True`` the vector matrix is memory-mapped read-only, so the OS
+    pages it in on demand instead of parsing it into Python floats.
+
+    Returns
+    -------
+    ChunkIndex
+        Columnar index whose ``vectors`` is the (mapped) matrix.
+    """
+    vec_path, meta_path = index_paths(base_path)
+    with open(meta_path, "rb") as f:
+        metadata = orjson.loads(f.read())
+    if not metadata:
+        return ChunkIndex(np.zeros((0, 0), dtype=np.float32), [])
+    vectors = np.load(vec_path, mmap_mode="r" if mmap else None)
+    return ChunkIndex(vectors, metadata)
@@ -1,7 +1,5 @@
 # src/utils/text_cleaning.py
 
-import re
-
 def basic_clean_text(text: str) -> str:
     """
     Basic text normalizer.
@@ -20,10 +18,6 @@ def basic_clean_text(text: str) -> str:
     str
         Cleaned text string.
     """
-    # Replace tabs and newlines with a space
-    text = text.replace('\t', ' ').replace('\n', ' ')
-
-    # Collapse multiple spaces into a single space
-    text = re.sub(r'\s+', ' ', text)
-
-    return text.strip()
\ No newline at end of file
+    # str.split() with no separator splits on any whitespace run and drops
+    # leading/trailing whitespace, so one C-level pass does all three steps
+    return " ".join(text.split())
\ No newline at end of file
@@ -2,16 +2,22 @@
 
 import os
 import shutil
+import time
+import atexit
 from typing import Tuple
-import json
 import threading
 import concurrent.futures
+import hashlib
 import pickle
+from collections import OrderedDict
 
 import gradio as gr
+import orjson
 
 from src.chatbot import PDFChatBot
+from src.search.chunk_index import ChunkIndex
 from src.utils.auth import hash_password, verify_password, migrate_plain_passwords
+from src.utils.index_store import index_exists, index_paths, load_chunk_index, save_chunk_index
 from scripts import pdf_extractor, chunker, build_index, section_rep_builder
 
 # ---------------------------------------------------------------------
@@ -26,17 +32,67 @@ _DB_LOCK = threading.RLock()
 
 def _load_user_db():
     if os.path.exists(USER_DB_PATH):
-        with open(USER_DB_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(USER_DB_PATH, "rb") as f:
+            return orjson.loads(f.read())
     # default structure
     return {"users": {}}
 
 
-def _save_user_db(db: dict):
-    """Persist the in‑memory DB atomically."""
-    with _DB_LOCK:
-        with open(USER_DB_PATH, "w", encoding="utf-8") as f:
-            json.dump(db, f, indent=2)
+# Writes requested within this window (seconds) are coalesced into one
+DB_FLUSH_INTERVAL = 0.2
+
+# Set when the in‑memory DB has changes not yet written to disk
+_DB_DIRTY = threading.Event()
+# Serializes file writes between the flusher thread and the exit hook
+_DB_FILE_LOCK = threading.Lock()
+
+
+def _flush_user_db():
+    """
+    Persist the in‑memory DB atomically if it has unwritten changes.
+
+    The dirty flag is checked and cleared under the file lock, just before
+    the snapshot is taken, so a change made while another write is in
+    flight is never mistaken for one that write already saved.
+    """
+    with _DB_FILE_LOCK:
+        if not _DB_DIRTY.is_set():
+            return
+        _DB_DIRTY.clear()
+        try:
+            with _DB_LOCK:
+                data = orjson.dumps(_USER_DB, option=orjson.OPT_INDENT_2)
+            tmp_path = USER_DB_PATH + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, USER_DB_PATH)
+        except OSError:
+            _DB_DIRTY.set()  # retry on the next flush
+            raise
+
+
+def _save_user_db():
+    """Mark the DB dirty; the background flusher writes it shortly after."""
+    _DB_DIRTY.set()
+
+
+def _db_flusher():
+    while True:
+        _DB_DIRTY.wait()
+        time.sleep(DB_FLUSH_INTERVAL)  # let a burst of updates accumulate
+        try:
+            _flush_user_db()
+        except OSError as e:
+            print(f"[ERROR] Failed to save user DB: {e}")
+
+
+def _final_flush():
+    """Write any pending changes before the process exits."""
+    _flush_user_db()
+
+
+threading.Thread(target=_db_flusher, name="user-db-flusher", daemon=True).start()
+atexit.register(_final_flush)
 
 DEFAULT_PROMPT = (
     "You are an assistant chatbot trained to answer questions. .\n"
@@ -51,11 +107,14 @@ DEFAULT_PROMPT = (
 # Max time (seconds) allowed for pdf_extractor.extract_pdf_content
 EXTRACT_TIMEOUT = 120  # 2 minutes
 
+# Long‑lived pool running extractions, so each upload doesn't spawn a thread
+_EXTRACT_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="pdf-extract")
+
 # In‑memory view of the persistent database
 _USER_DB = _load_user_db()
 # Migrate plain passwords to hashed passwords if needed
 _USER_DB = migrate_plain_passwords(_USER_DB)
-_save_user_db(_USER_DB)
+_save_user_db()
 USERS = {u: info["password"] for u, info in _USER_DB["users"].items()}
 
 
@@ -92,7 +151,7 @@ def login(username: str, password: str):
                 "uploads": [],
                 "prompts": [],
             }
-            _save_user_db(_USER_DB)
+            _save_user_db()
         return True, username, "New user created and logged in."
     return False, "", "Invalid credentials."
 
@@ -134,51 +193,132 @@ def login_and_prepare(username: str, password: str):
 # ---------------------------------------------------------------------
 # Extraction cache helpers (per‑user, per‑PDF)
 # ---------------------------------------------------------------------
-def _cache_paths(user_dir: str, pdf_basename: str):
-    """Return tuple (sections_path, index_path) inside the user directory."""
-    sec_path = os.path.join(user_dir, f"{pdf_basename}_sections.json")
-    idx_path = os.path.join(user_dir, f"{pdf_basename}_index.pkl")
-    return sec_path, idx_path
+# Caches are keyed by a hash of the PDF bytes, so re-uploading the same file
+# (under any name) reuses the existing extraction instead of redoing it.
+def _pdf_digest(pdf_path: str) -> str:
+    """Return a 16‑hex‑char BLAKE2b hash of the file contents."""
+    h = hashlib.blake2b(digest_size=8)
+    with open(pdf_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _cache_key(username: str, pdf_path: str) -> str:
+    """
+    Return the content digest of an uploaded PDF, using the one recorded in
+    the user DB when available and recording it otherwise. Users without a
+    DB record (never the case once logged in) just get the digest computed.
+    """
+    name = os.path.basename(pdf_path)
+    with _DB_LOCK:
+        user_record = _USER_DB["users"].get(username)
+        digest = user_record.get("digests", {}).get(name) if user_record is not None else None
+    if digest is None:
+        digest = _pdf_digest(pdf_path)
+        if user_record is not None:
+            with _DB_LOCK:
+                user_record.setdefault("digests", {})[name] = digest
+                _save_user_db()
+    return digest
+
+
+def _cache_paths(user_dir: str, cache_key: str):
+    """Return tuple (sections_path, index_base) inside the user directory."""
+    sec_path = os.path.join(user_dir, f"{cache_key}_sections.json")
+    idx_base = os.path.join(user_dir, f"{cache_key}_index")
+    return sec_path, idx_base
+
+def _remove_cache(user_dir: str, cache_key: str):
+    sec_path, idx_base = _cache_paths(user_dir, cache_key)
+    for p in (sec_path, *index_paths(idx_base)):
+        if os.path.exists(p):
+            try:
+                os.remove(p)
+            except OSError:
+                pass  # ignore
 
-def _save_cache(user_dir: str, pdf_basename: str,
+def _save_cache(user_dir: str, cache_key: str,
                 sections: list, chunk_index: list):
-    sec_path, idx_path = _cache_paths(user_dir, pdf_basename)
-    with open(sec_path, "w", encoding="utf-8") as f:
-        json.dump(sections, f, ensure_ascii=False, indent=2)
-    with open(idx_path, "wb") as f:
-        pickle.dump(chunk_index, f)
-
-def _load_cache(user_dir: str, pdf_basename: str):
-    sec_path, idx_path = _cache_paths(user_dir, pdf_basename)
-    if os.path.exists(sec_path) and os.path.exists(idx_path):
+    sec_path, idx_base = _cache_paths(user_dir, cache_key)
+    save_chunk_index(chunk_index, idx_base)
+    # Sections go last and atomically: their presence marks a complete cache
+    with open(sec_path + ".tmp", "wb") as f:
+        f.write(orjson.dumps(sections, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+    os.replace(sec_path + ".tmp", sec_path)
+
+def _legacy_cache_paths(user_dir: str, pdf_name: str):
+    """Return tuple (sections_path, pickle_path) of the old name‑keyed cache."""
+    pdf_basename = os.path.splitext(pdf_name)[0]
+    sec_path = os.path.join(user_dir, f"{pdf_basename}_sections.json")
+    pkl_path = os.path.join(user_dir, f"{pdf_basename}_index.pkl")
+    return sec_path, pkl_path
+
+def _remove_legacy_cache(user_dir: str, pdf_name: str):
+    for p in _legacy_cache_paths(user_dir, pdf_name):
+        if os.path.exists(p):
+            try:
+                os.remove(p)
+            except OSError:
+                pass  # ignore
+
+def _migrate_legacy_cache(user_dir: str, pdf_name: str, cache_key: str):
+    """
+    Convert a cache written by older versions (sections JSON + pickled
+    index, keyed by PDF name) into the current digest‑keyed format, then
+    remove the old files.
+    """
+    sec_path, pkl_path = _legacy_cache_paths(user_dir, pdf_name)
+    if not (os.path.exists(sec_path) and os.path.exists(pkl_path)):
+        return
+    try:
+        with open(sec_path, "rb") as f:
+            sections = orjson.loads(f.read())
+        with open(pkl_path, "rb") as f:
+            chunk_index = pickle.load(f)
+        _save_cache(user_dir, cache_key, sections, chunk_index)
+    except Exception as e:
+        # corrupted legacy cache – the PDF is reprocessed instead
+        print(f"[WARN] Could not migrate legacy cache for {pdf_name}: {e}")
+    _remove_legacy_cache(user_dir, pdf_name)
+
+def _load_cache(user_dir: str, cache_key: str, pdf_name: str = None):
+    sec_path, idx_base = _cache_paths(user_dir, cache_key)
+    if pdf_name is not None and not os.path.exists(sec_path):
+        _migrate_legacy_cache(user_dir, pdf_name, cache_key)
+    if os.path.exists(sec_path) and index_exists(idx_base):
         try:
-            with open(sec_path, "r", encoding="utf-8") as f:
-                sections = json.load(f)
-            with open(idx_path, "rb") as f:
-                chunk_index = pickle.load(f)
+            with open(sec_path, "rb") as f:
+                sections = orjson.loads(f.read())
+            # Vectors are memory-mapped, not deserialized
+            chunk_index = load_chunk_index(idx_base)
             return sections, chunk_index
-        except Exception:
-            # corrupted cache – ignore
-            pass
+        except Exception as e:
+            # corrupted or malformed cache – ignore and reprocess
+            print(f"[WARN] Ignoring unreadable cache {cache_key}: {e}")
     return None, None
 
 
-def process_pdf(pdf_path: str, user_dir: str, timeout: int = EXTRACT_TIMEOUT) -> Tuple[list, list]:
+def process_pdf(pdf_path: str, user_dir: str, timeout: int = EXTRACT_TIMEOUT,
+                cache_key: str = None) -> Tuple[list, list]:
     """
     Run the extraction/index pipeline with a timeout guard.
-    Results are cached to disk inside user_dir for later reuse.
+    Results are cached to disk inside user_dir under *cache_key* (the PDF's
+    content digest, computed if not given) for later reuse.
     """
-    pdf_basename = os.path.splitext(os.path.basename(pdf_path))[0]
+    if cache_key is None:
+        cache_key = _pdf_digest(pdf_path)
 
     # Run extractor with timeout
     def _do_extract():
         return pdf_extractor.extract_pdf_content(pdf_path)
 
+    future = _EXTRACT_POOL.submit(_do_extract)
     try:
-        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as ex:
-            future = ex.submit(_do_extract)
-            extracted = future.result(timeout=timeout)
+        extracted = future.result(timeout=timeout)
     except concurrent.futures.TimeoutError:
+        # A running extraction can't be interrupted; this drops it if still queued
+        future.cancel()
         raise RuntimeError("PDF extraction timed out (over 2 minutes).")
 
     chunks = chunker.process_extracted_file(extracted)
@@ -186,23 +326,48 @@ def process_pdf(pdf_path: str, user_dir: str, timeout: int = EXTRACT_TIMEOUT) ->
     sections = section_rep_builder.build_section_reps(extracted["sections"], chunk_index)
 
     # Save to cache
-    _save_cache(user_dir, pdf_basename, sections, chunk_index)
+    _save_cache(user_dir, cache_key, sections, chunk_index)
     return sections, chunk_index
 
 
+def _link_or_copy(src: str, dst: str):
+    """
+    Place *src* at *dst* via a hard link (constant time on the same
+    filesystem), falling back to a full copy across filesystems.
+    """
+    if os.path.exists(dst):
+        if os.path.samefile(src, dst):
+            return
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy(src, dst)
+
+
 def load_pdf(pdf_file, system_prompt, username):
     if not username:
         return None, None, "Please log in first."
     if pdf_file is None:
         return None, None, "Please upload a PDF."
     user_dir = ensure_user_dir(username)
-    dest_path = os.path.join(user_dir, os.path.basename(pdf_file.name))
-    shutil.copy(pdf_file.name, dest_path)
-    try:
-        sections, chunk_index = process_pdf(dest_path, user_dir)
-        msg = f"Processed {os.path.basename(dest_path)}"
-    except RuntimeError as e:
-        return None, None, str(e)
+    pdf_name = os.path.basename(pdf_file.name)
+    dest_path = os.path.join(user_dir, pdf_name)
+    _link_or_copy(pdf_file.name, dest_path)
+    # An old name-keyed cache may describe the file this upload replaced
+    _remove_legacy_cache(user_dir, pdf_name)
+
+    # Identical bytes were processed before (possibly under another name)
+    digest = _pdf_digest(dest_path)
+    sections, chunk_index = _load_cache(user_dir, digest)
+    if sections is None or chunk_index is None:
+        try:
+            sections, chunk_index = process_pdf(dest_path, user_dir, cache_key=digest)
+            msg = f"Processed {pdf_name}"
+        except RuntimeError as e:
+            return None, None, str(e)
+    else:
+        msg = f"Loaded cached data for {pdf_name}"
     # Record upload & system prompt for this user and persist
     with _DB_LOCK:
         user_record = _USER_DB["users"].setdefault(
@@ -211,9 +376,15 @@ def load_pdf(pdf_file, system_prompt, username):
         )
         if dest_path not in user_record["uploads"]:
             user_record["uploads"].append(dest_path)
+        digests = user_record.setdefault("digests", {})
+        old_digest = digests.get(pdf_name)
+        digests[pdf_name] = digest
+        # Same name re-uploaded with new contents: drop the orphaned cache
+        if old_digest and old_digest != digest and old_digest not in digests.values():
+            _remove_cache(user_dir, old_digest)
         if system_prompt and system_prompt not in user_record["prompts"]:
             user_record["prompts"].append(system_prompt)
-        _save_user_db(_USER_DB)
+        _save_user_db()
     return sections, chunk_index, msg
 
 
@@ -229,11 +400,11 @@ def load_existing_pdf(selected_name, username):
         return None, None, "File not found."
 
     # Attempt to load cached sections/index
-    pdf_basename = os.path.splitext(selected_name)[0]
-    sections, chunk_index = _load_cache(user_dir, pdf_basename)
+    digest = _cache_key(username, pdf_path)
+    sections, chunk_index = _load_cache(user_dir, digest, selected_name)
     if sections is None or chunk_index is None:
         try:
-            sections, chunk_index = process_pdf(pdf_path, user_dir)
+            sections, chunk_index = process_pdf(pdf_path, user_dir, cache_key=digest)
             msg = f"Processed {selected_name}"
         except RuntimeError as e:
             return None, None, str(e)
@@ -245,7 +416,8 @@ def load_existing_pdf(selected_name, username):
 def load_all_cached_pdfs(username):
     """
     Load sections + chunk index for every PDF the user has previously uploaded.
-    Sections are concatenated in upload order; chunk indexes are merged.
+    Sections are concatenated in upload order; chunk indexes are merged
+    without copying their memory-mapped vectors.
     """
     if not username:
         return None, None, "Please log in first."
@@ -257,8 +429,11 @@ def load_all_cached_pdfs(username):
     all_sections = []
     all_chunks = []
     for pdf_path in uploads:
+        if not os.path.exists(pdf_path):
+            continue
         pdf_basename = os.path.splitext(os.path.basename(pdf_path))[0]
-        sections, chunk_index = _load_cache(user_dir, pdf_basename)
+        sections, chunk_index = _load_cache(user_dir, _cache_key(username, pdf_path),
+                                            os.path.basename(pdf_path))
         if sections is None or chunk_index is None:
             # Skip files that were never processed / cache missing
             continue
@@ -269,13 +444,13 @@ def load_all_cached_pdfs(username):
             sec_copy["file_name"] = pdf_basename  # add filename field
             tagged_sections.append(sec_copy)
         all_sections.extend(tagged_sections)
-        all_chunks.extend(chunk_index)
+        all_chunks.append(chunk_index)
 
     if not all_sections:
         return None, None, "No cached data found. Process PDFs first."
 
     msg = f"Loaded cached data for {len(all_sections)} sections across {len(uploads)} PDFs"
-    return all_sections, all_chunks, msg
+    return all_sections, ChunkIndex.concat(all_chunks), msg
 
 
 def delete_cached_pdf(selected_name, username):
@@ -292,28 +467,27 @@ def delete_cached_pdf(selected_name, username):
     if not os.path.exists(pdf_path):
         return None, None, gr.update(), "File not found."
 
+    digest = _cache_key(username, pdf_path)
+
     # Remove pdf file
     try:
         os.remove(pdf_path)
     except OSError as e:
         return None, None, gr.update(), f"Delete failed: {e}"
 
-    # Remove cached section/index files
-    pdf_basename = os.path.splitext(selected_name)[0]
-    sec_path, idx_path = _cache_paths(user_dir, pdf_basename)
-    for p in (sec_path, idx_path):
-        if os.path.exists(p):
-            try:
-                os.remove(p)
-            except OSError:
-                pass  # ignore
-
-    # Update user DB
+    # Update user DB; remove cached section/index files unless another
+    # upload with identical contents still uses them
     with _DB_LOCK:
-        uploads = _USER_DB["users"].get(username, {}).get("uploads", [])
+        user_record = _USER_DB["users"].get(username, {})
+        uploads = user_record.get("uploads", [])
         if pdf_path in uploads:
             uploads.remove(pdf_path)
-        _save_user_db(_USER_DB)
+        digests = user_record.get("digests", {})
+        digests.pop(selected_name, None)
+        if digest not in digests.values():
+            _remove_cache(user_dir, digest)
+        _remove_legacy_cache(user_dir, selected_name)
+        _save_user_db()
 
     # Build new dropdown choices
     choices = [os.path.basename(u) for u in uploads]
@@ -322,6 +496,47 @@ def delete_cached_pdf(selected_name, username):
     return None, None, dropdown_update, msg
 
 
+# ---------------------------------------------------------------------
+# Chatbot cache (one bot per loaded PDF set + system prompt)
+# ---------------------------------------------------------------------
+# Max number of PDFChatBot instances kept alive at once
+BOT_CACHE_SIZE = 8
+
+# key -> (bot, sections, chunk_index); the inputs are pinned alongside the bot
+# so their ids cannot be reused by other objects while the entry exists
+_BOT_CACHE: "OrderedDict[tuple, tuple]" = OrderedDict()
+_BOT_CACHE_LOCK = threading.Lock()
+
+
+def _get_bot(sections: list, chunk_index: list, prompt: str) -> PDFChatBot:
+    """
+    Return a cached PDFChatBot for this sections/index/prompt combination,
+    building it only on a cache miss. Keyed by object identity of the loaded
+    sections/index plus a hash of the prompt.
+    """
+    prompt_hash = hashlib.blake2b(prompt.encode("utf-8"), digest_size=8).digest()
+    key = (id(sections), id(chunk_index), prompt_hash)
+    with _BOT_CACHE_LOCK:
+        entry = _BOT_CACHE.get(key)
+        if entry is not None:
+            _BOT_CACHE.move_to_end(key)
+            return entry[0]
+
+    # Build outside the lock so other users' lookups are not blocked
+    bot = PDFChatBot(sections, chunk_index, system_prompt=prompt)
+
+    with _BOT_CACHE_LOCK:
+        entry = _BOT_CACHE.get(key)
+        if entry is not None:
+            # Another request built the same bot meanwhile; keep theirs
+            _BOT_CACHE.move_to_end(key)
+            return entry[0]
+        _BOT_CACHE[key] = (bot, sections, chunk_index)
+        if len(_BOT_CACHE) > BOT_CACHE_SIZE:
+            _BOT_CACHE.popitem(last=False)
+        return bot
+
+
 def ask_question(question, sections, chunk_index, system_prompt, username, use_index):
     fine_only = not use_index 
     if not username:
@@ -329,7 +544,7 @@ def ask_question(question, sections, chunk_index, system_prompt, username, use_i
     if sections is None or chunk_index is None:
         return "Please upload and process a PDF first."
     prompt = system_prompt or DEFAULT_PROMPT
-    bot = PDFChatBot(sections, chunk_index, system_prompt=prompt)
+    bot = _get_bot(sections, chunk_index, prompt)
     answer = bot.answer(question, fine_only=fine_only)
     answer = answer.replace('<|endoftext|><|im_start|>user',"=== System Prompt ===")
     answer = answer.replace('<|im_end|>\n<|im_start|>assistant','')